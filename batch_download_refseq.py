@@ -13,6 +13,7 @@ import argparse
 import re
 import time
 import requests
+from bgzf_fasta import BgzfFastaWriter
 
 def main():
     parser = argparse.ArgumentParser(description="Downloads RefSeq sequences under a user-defined set of taxonomic groups in batches of 500")
@@ -21,6 +22,7 @@ def main():
     parser.add_argument("-o", "--output_directory", help = "specify output directory of downloaded sequence files") # default = $DB_NAME/sequences
     parser.add_argument("-k", "--api_key", help = "specify NCBI API key (optional)", default = None)
     parser.add_argument("-v", "--verbose", help = "toggles verbose mode on", action = "store_true")
+    parser.add_argument("-z", "--bgzip", help = "write BGZF-compressed FASTA (.fa.gz) with .fai/.gzi indexes", action = "store_true")
     args = parser.parse_args()
 
     db = "nucleotide"
@@ -50,7 +52,12 @@ def main():
     count = get_substring(m3, ">", "<")
 
     print(f"Downloading {count} {query_name} (taxid: {query_taxid}) RefSeq sequences in batches of 500...")
-    with open(os.path.join(args.output_directory, f"{query_name}_{query_taxid}.fa"), "w") as w:
+    out_file = os.path.join(args.output_directory, f"{query_name}_{query_taxid}.fa")
+    if args.bgzip:
+        out = BgzfFastaWriter(out_file + ".gz")
+    else:
+        out = open(out_file, "w")
+    with out as w:
         retmax = 500
         for i in range(0, int(count), retmax):
             efetch_url = base + f"efetch.fcgi?db={db}&WebEnv={web_env}"
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------
+# Created By: Irsyaad Hasif (hasifirsyaad@gmail.com)
+# Created On: 19 Oct 2026
+# Version: 1.0
+#------------------------------------------------------------------
+# This module writes FASTA files as BGZF block-compressed gzip,
+# building samtools-compatible .fai and .gzi indexes while the
+# sequences are streamed in, and reads individual records back
+# with a single seek instead of a linear scan.
+#------------------------------------------------------------------
+
+import argparse
+import bisect
+import struct
+import zlib
+
+BLOCK_SIZE = 0xff00 # max uncompressed bytes per block (as in htslib)
+MAX_BLOCK_SIZE = 0x10000
+HEADER = struct.Struct("<4BI2BH2BHH") # magic, method, flags, mtime, xfl, os, xlen, 'B', 'C', slen, bsize
+EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Fetches records from an indexed BGZF-compressed FASTA file")
+    parser.add_argument("-i", required = True, help = "specify BGZF-compressed FASTA file (with .fai and .gzi indexes)")
+    parser.add_argument("accessions", nargs = "*", help = "specify accession(s) to fetch - lists all accessions if none are given")
+    args = parser.parse_args()
+
+    with BgzfFastaReader(args.i) as reader:
+        if not args.accessions:
+            for name in reader.names():
+                print(name)
+            return
+        for name in args.accessions:
+            print(reader.fetch_record(name), end = "")
+
+class BgzfWriter(object):
+    def __init__(self, filename, level = 6):
+        self.handle = open(filename, "wb")
+        self.level = level
+        self.buffer = bytearray()
+        self.blocks = [] # (compressed offset, uncompressed offset) of each block
+        self.coffset = 0
+        self.uoffset = 0
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= BLOCK_SIZE:
+            self._write_block(bytes(self.buffer[:BLOCK_SIZE]))
+            del self.buffer[:BLOCK_SIZE]
+
+    def _write_block(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        cdata = compressor.compress(data) + compressor.flush()
+        if len(cdata) + 26 > MAX_BLOCK_SIZE: # incompressible data - store instead
+            compressor = zlib.compressobj(0, zlib.DEFLATED, -15)
+            cdata = compressor.compress(data) + compressor.flush()
+        bsize = len(cdata) + 26
+        self.handle.write(HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, 66, 67, 2, bsize - 1))
+        self.handle.write(cdata)
+        self.handle.write(struct.pack("<II", zlib.crc32(data) & 0xffffffff, len(data)))
+        self.blocks.append((self.coffset, self.uoffset))
+        self.coffset += bsize
+        self.uoffset += len(data)
+
+    def close(self):
+        if self.buffer:
+            self._write_block(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.handle.write(EOF_BLOCK)
+        self.handle.close()
+
+    def write_gzi(self, filename):
+        # first block is implicitly at (0, 0)
+        with open(filename, "wb") as w:
+            w.write(struct.pack("<Q", len(self.blocks) - 1 if self.blocks else 0))
+            for coffset, uoffset in self.blocks[1:]:
+                w.write(struct.pack("<QQ", coffset, uoffset))
+
+class BgzfFastaWriter(object):
+    """Streams FASTA text into a BGZF file, writing <file>.fai and <file>.gzi on close"""
+    def __init__(self, filename, level = 6):
+        self.filename = filename
+        self.bgzf = BgzfWriter(filename, level)
+        self.partial = ""
+        self.records = [] # [name, length, offset, linebases, linewidth]
+        self.pos = 0 # uncompressed offset (in encoded bytes)
+        self.short_line = False # current record already had a line shorter than its line width
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else: # don't write indexes for an incomplete file
+            self.bgzf.close()
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        out = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if line == "": # blank lines between efetch batches would break the index
+                continue
+            # deflines may contain non-ASCII characters, so offsets are counted in UTF-8 bytes
+            data = (line + "\n").encode("utf-8")
+            if line.startswith(">"):
+                self.records.append([line[1:].split()[0], 0, self.pos + len(data), None, None])
+                self.short_line = False
+            elif self.records:
+                record = self.records[-1]
+                linebases = len(data) - 1
+                if record[3] is None:
+                    record[3], record[4] = linebases, len(data)
+                # as in samtools faidx, only the last line of a record may be shorter
+                if self.short_line or linebases > record[3]:
+                    raise ValueError(f"Different line length in sequence {record[0]} - cannot index")
+                if linebases < record[3]:
+                    self.short_line = True
+                record[1] += linebases
+            out.append(data)
+            self.pos += len(data)
+        if out:
+            self.bgzf.write(b"".join(out))
+
+    def close(self):
+        if self.partial:
+            self.write("\n")
+        self.bgzf.close()
+        self.bgzf.write_gzi(self.filename + ".gzi")
+        with open(self.filename + ".fai", "w", encoding = "utf-8") as w:
+            for name, length, offset, linebases, linewidth in self.records:
+                w.write(f"{name}\t{length}\t{offset}\t{linebases or 0}\t{linewidth or 0}\n")
+
+class BgzfFastaReader(object):
+    """Random access to records of a BGZF FASTA file through its .fai and .gzi indexes"""
+    def __init__(self, filename):
+        self.handle = open(filename, "rb")
+        self.index = {}
+        with open(filename + ".fai", "r", encoding = "utf-8") as r:
+            for line in r:
+                name, length, offset, linebases, linewidth = line.rstrip("\n").split("\t")[:5]
+                self.index[name] = (int(length), int(offset), int(linebases), int(linewidth))
+        self.coffsets = [0]
+        self.uoffsets = [0]
+        with open(filename + ".gzi", "rb") as r:
+            count = struct.unpack("<Q", r.read(8))[0]
+            for _ in range(count):
+                coffset, uoffset = struct.unpack("<QQ", r.read(16))
+                self.coffsets.append(coffset)
+                self.uoffsets.append(uoffset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index.keys())
+
+    def close(self):
+        self.handle.close()
+
+    def _read_block(self):
+        header = self.handle.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return b""
+        bsize = HEADER.unpack(header)[-1] + 1
+        rest = self.handle.read(bsize - HEADER.size)
+        return zlib.decompress(rest[:-8], -15)
+
+    def read(self, uoffset, size):
+        """Read size uncompressed bytes starting at uoffset"""
+        i = bisect.bisect_right(self.uoffsets, uoffset) - 1
+        self.handle.seek(self.coffsets[i])
+        skip = uoffset - self.uoffsets[i]
+        chunks = []
+        remaining = size + skip
+        while remaining > 0:
+            block = self._read_block()
+            if not block:
+                break
+            chunks.append(block)
+            remaining -= len(block)
+        return b"".join(chunks)[skip:skip + size]
+
+    def fetch(self, name):
+        """Return sequence of record name (without line breaks)"""
+        if name not in self.index:
+            raise KeyError(f"{name} not found in index")
+        length, offset, linebases, linewidth = self.index[name]
+        if length == 0:
+            return ""
+        size = (length // linebases) * linewidth + length % linebases
+        data = self.read(offset, size).decode("ascii")
+        return "".join(data.split())
+
+    def fetch_record(self, name, width = 70):
+        """Return record name as FASTA text"""
+        length, offset, linebases, linewidth = self.index[name]
+        # header line ends right before the first base - scan back to the preceding newline
+        end = offset - 1
+        start = end
+        head = b""
+        while start > 0:
+            chunk_start = max(0, start - 4096)
+            head = self.read(chunk_start, start - chunk_start) + head
+            start = chunk_start
+            if b"\n" in head[:end - start]:
+                break
+        head = head[:end - start]
+        header = head[head.rfind(b"\n") + 1:] + b"\n"
+        if not header.startswith(b">"):
+            raise ValueError(f"Corrupt index: no header line found before {name}")
+        header = header.decode("utf-8")
+        seq = self.fetch(name)
+        lines = [seq[i:i + width] for i in range(0, len(seq), width)]
+        return header + "".join(line + "\n" for line in lines)
+
+if __name__ == "__main__":
+    main()
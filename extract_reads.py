@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------
+# Created By: Irsyaad Hasif (hasifirsyaad@gmail.com)
+# Created On: 19 Oct 2026
+# Version: 1.0
+#------------------------------------------------------------------
+# This script extracts the reads classified under one or more
+# taxonomic groups (and all their descendants) from the original
+# FASTQ file(s), streaming the Kraken2 standard output and the
+# FASTQ file(s) in lockstep in a single pass.
+#------------------------------------------------------------------
+
+import os
+import argparse
+import gzip
+import shutil
+import subprocess
+from filter_ncbi_taxonomy import load_ncbi_taxonomy
+
+def main():
+    cwd = os.getcwd()
+    tax_dir = os.path.join(cwd, "taxonomy")
+
+    parser = argparse.ArgumentParser(description = "Extracts reads classified under user-defined taxonomic groups from FASTQ files")
+    parser.add_argument("-t", "--taxids", nargs = "+", required = True, help = "specify taxid(s) of taxonomic group(s) to extract")
+    parser.add_argument("-s", "--standard_output", required = True, help = "specify Kraken2 standard output file (may be gzipped)")
+    parser.add_argument("-1", "--fastq_1", required = True, help = "specify FASTQ file used as Kraken2 input, or read 1 of a pair (may be gzipped)")
+    parser.add_argument("-2", "--fastq_2", help = "specify read 2 FASTQ file of a pair (may be gzipped)", default = None)
+    parser.add_argument("-d", "--taxonomy_directory", help = "specify directory containing nodes.dmp", default = tax_dir)
+    parser.add_argument("-o", "--output_prefix", help = "specify prefix of output FASTQ file(s)", default = "extracted_reads")
+    parser.add_argument("-z", "--gzip", help = "gzip-compress output FASTQ file(s)", action = "store_true")
+    parser.add_argument("--exclude_descendants", help = "only extract reads assigned directly to the given taxids", action = "store_true")
+    args = parser.parse_args()
+
+    done_msg = "DONE"
+
+    if args.exclude_descendants:
+        targets = set(args.taxids)
+    else:
+        print("Parsing nodes.dmp...", end = " ", flush = True)
+        ncbi_taxonomy, _ = load_ncbi_taxonomy({}, os.path.join(args.taxonomy_directory, "nodes.dmp"))
+        print(done_msg)
+        targets = set()
+        for taxid in args.taxids:
+            if taxid not in ncbi_taxonomy:
+                print(f"Taxid {taxid} not found in nodes.dmp - skipping")
+                continue
+            targets.update(get_descendants(ncbi_taxonomy, taxid))
+    print(f"Extracting reads classified under {len(targets)} taxids...")
+
+    ext = ".fq.gz" if args.gzip else ".fq"
+    if args.fastq_2 is None:
+        out_files = [f"{args.output_prefix}{ext}"]
+        in_files = [args.fastq_1]
+    else:
+        out_files = [f"{args.output_prefix}_1{ext}", f"{args.output_prefix}_2{ext}"]
+        in_files = [args.fastq_1, args.fastq_2]
+
+    extracted, total = extract_reads(args.standard_output, in_files, out_files, targets)
+    print(f"Extracted {extracted} of {total} reads to {', '.join(out_files)}")
+
+def get_descendants(name_object, taxid):
+    """Get taxid and all its descendants (iterative, safe for large clades)"""
+    descendants = set()
+    stack = [taxid]
+    while stack:
+        node = stack.pop()
+        if node in descendants:
+            continue
+        descendants.add(node)
+        stack.extend(name_object[node].children)
+    return descendants
+
+def open_input(filename):
+    """Open a (possibly gzipped) file for binary reading, decompressing in a separate pigz process if available"""
+    if not filename.endswith(".gz"):
+        return open(filename, "rb")
+    pigz = shutil.which("pigz")
+    if pigz is None:
+        return gzip.open(filename, "rb")
+    return PipeReader([pigz, "-dc", filename])
+
+def open_output(filename):
+    """Open a file for binary writing, compressing in a separate pigz process if available"""
+    if not filename.endswith(".gz"):
+        return open(filename, "wb")
+    pigz = shutil.which("pigz")
+    if pigz is None:
+        return gzip.open(filename, "wb", compresslevel = 6)
+    return PipeWriter([pigz, "-c"], filename)
+
+class PipeReader(object):
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.proc = subprocess.Popen(cmd, stdout = subprocess.PIPE, bufsize = 1 << 20)
+        self.stream = self.proc.stdout
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def readline(self):
+        return self.stream.readline()
+
+    def close(self):
+        # exit status only means something after a full read - stopping early kills
+        # the decompressor with SIGPIPE
+        drained = self.stream.read(1) == b""
+        self.stream.close()
+        status = self.proc.wait()
+        if drained and status != 0: # eg. truncated or corrupt gzip input
+            raise RuntimeError(f"Decompression of {self.cmd[-1]} failed")
+
+class PipeWriter(object):
+    def __init__(self, cmd, filename):
+        self.handle = open(filename, "wb")
+        self.proc = subprocess.Popen(cmd, stdin = subprocess.PIPE, stdout = self.handle, bufsize = 1 << 20)
+        self.stream = self.proc.stdin
+
+    def write(self, data):
+        self.stream.write(data)
+
+    def close(self):
+        self.stream.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"Compression of {self.handle.name} failed")
+        self.handle.close()
+
+def read_fastq_record(handle):
+    """Read one 4-line FASTQ record as a list of lines, or None at end of file"""
+    header = handle.readline()
+    if not header:
+        return None
+    record = [header, handle.readline(), handle.readline(), handle.readline()]
+    if not record[3]:
+        raise ValueError(f"Truncated FASTQ record: {header.decode().strip()}")
+    return record
+
+def get_read_id(header):
+    """Read ID from FASTQ header or Kraken2 standard output, without mate suffix (/1 or /2)"""
+    read_id = header.lstrip(b"@").split(None, 1)[0]
+    if read_id.endswith(b"/1") or read_id.endswith(b"/2"):
+        read_id = read_id[:-2]
+    return read_id
+
+def get_classified_taxid(field):
+    """Taxid from Kraken2 standard output, with or without --use-names"""
+    field = field.strip()
+    if field.endswith(b")"):
+        field = field[field.rindex(b" ") + 1:-1]
+    return field.decode()
+
+def close_all(handles, ignore_errors = False):
+    """Close every handle, even if closing an earlier one fails, then raise the first error"""
+    error = None
+    for handle in handles:
+        try:
+            handle.close()
+        except Exception as e:
+            if error is None:
+                error = e
+    if error is not None and not ignore_errors:
+        raise error
+
+def extract_reads(kraken_file, in_files, out_files, targets):
+    """Stream Kraken2 standard output and FASTQ file(s) in lockstep, writing reads classified under targets
+
+    Returns:
+        extracted, total
+
+    """
+    kraken = open_input(kraken_file)
+    inputs = [open_input(f) for f in in_files]
+    outputs = [open_output(f) for f in out_files]
+    handles = [kraken] + inputs + outputs
+    extracted = 0
+    total = 0
+    try:
+        for line in kraken:
+            tab = line.split(b"\t", 4)
+            records = [read_fastq_record(handle) for handle in inputs]
+            if any(record is None for record in records):
+                raise ValueError(f"FASTQ file(s) ended before Kraken2 standard output at read {tab[1].decode()}")
+            total += 1
+            if tab[0] != b"C" or get_classified_taxid(tab[2]) not in targets:
+                continue
+            read_id = get_read_id(tab[1])
+            for record in records:
+                if get_read_id(record[0]) != read_id:
+                    raise ValueError(f"Read order mismatch: {get_read_id(record[0]).decode()} in FASTQ but {read_id.decode()} in Kraken2 standard output")
+            for record, out in zip(records, outputs):
+                out.write(b"".join(record))
+            extracted += 1
+        for f, handle in zip(in_files, inputs):
+            if read_fastq_record(handle) is not None:
+                raise ValueError(f"{f} has more reads than Kraken2 standard output - check that the correct files were given")
+    except BaseException:
+        # keep the original error - don't let a failing close replace it
+        close_all(handles, ignore_errors = True)
+        raise
+    close_all(handles)
+    return extracted, total
+
+if __name__ == "__main__":
+    main()
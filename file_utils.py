@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------
+# Created By: Irsyaad Hasif (hasifirsyaad@gmail.com)
+# Created On: 19 Oct 2026
+# Version: 1.0
+#------------------------------------------------------------------
+# This module contains file helpers shared by the pipeline scripts.
+#------------------------------------------------------------------
+
+import os
+
+def file_signature(filename):
+    """Cheap version stamp of a file (size + modification time), "missing" if it does not exist"""
+    if not os.path.exists(filename):
+        return "missing"
+    st = os.stat(filename)
+    return f"{st.st_size}:{st.st_mtime_ns}"
@@ -22,6 +22,7 @@ def main():
     parser.add_argument('-i', required = True, help = "specify input file in .txt format - taxon names must be newline-separated")
     parser.add_argument('-m', '--makefile_name', help = "specify filename of makefile with .mk extension", default = "batch_download_refseq.mk")
     parser.add_argument("-k", "--api_key", help = "specify NCBI API key", default = None)
+    parser.add_argument("-z", "--bgzip", help = "download sequences as BGZF-compressed FASTA (.fa.gz) with .fai/.gzi indexes", action = "store_true")
     args = parser.parse_args()
 
     if not os.path.exists(default_seq_path):
@@ -64,11 +65,14 @@ def main():
     mg = MakefileGenerator(args.makefile_name)
 
     for query in query_list:
-        tgt = f'{default_seq_path}/{query[1]}_{query[0]}.fa.OK'
+        ext = ".fa.gz" if args.bgzip else ".fa"
+        tgt = f'{default_seq_path}/{query[1]}_{query[0]}{ext}.OK'
         dep = ''
         cmd = f'~/cavs-taxonomic-classification/batch_download_refseq.py -i {query[0]} -n {query[1]} -o {default_seq_path}'
         if args.api_key != None:
             cmd += f" -k {args.api_key}"
+        if args.bgzip:
+            cmd += " -z"
         mg.add(tgt, dep, cmd)
 
     os.chdir(db_path)
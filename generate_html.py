@@ -29,6 +29,7 @@ def main():
     parser.add_argument("-f", "--output_filename", help = "specify filename of HTML report", default = "results.html")
     parser.add_argument("-q", "--query_name", help = "specify a recognisable query name based on your experiment (eg. Pangolin-herpes-tumor-DNA)", default = "taxo_query")
     parser.add_argument("-u", "--update_taxonomy", help = "update NCBI taxonomy files", action = "store_true")
+    parser.add_argument("-d", "--taxonomy_directory", help = "specify directory containing nodes.dmp and names.dmp to colour radial tree tips by phylum", default = None)
     args = parser.parse_args()
 
     # copy CSS, javascript and Kraken2/Bracken output files to HTML directory
@@ -55,6 +56,8 @@ def main():
     cmd = f"~/cavs-taxonomic-classification/generate_radial_tree.py -i {args.report_output} -o {args.tree_name}"
     if args.update_taxonomy:
         cmd += f" --update_taxonomy"
+    if args.taxonomy_directory is not None:
+        cmd += f" -d {os.path.abspath(args.taxonomy_directory)}"
     os.system(cmd)
     print(done_msg)
 
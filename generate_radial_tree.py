@@ -11,7 +11,13 @@
 
 import os
 import argparse
+import heapq
 from ete3 import Tree, NCBITaxa
+from render_cache import RenderCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, make_key, file_digest
+from file_utils import file_signature
+
+R_SCRIPT = os.path.expanduser("~/cavs-taxonomic-classification/generate_radial_tree.R")
+DEFAULT_MAX_TIPS = 2000
 
 def main():
     cwd = os.getcwd()
@@ -25,31 +31,263 @@ def main():
     parser.add_argument("-i", required = True, help = "specify Kraken2/Bracken report output")
     parser.add_argument("-o", "--output_tree", help = "specify filename of output tree image (default filetype = .svg)", default = "radial_tree.svg")
     parser.add_argument("-u", "--update_taxonomy", help = "update NCBI taxonomy files", action = "store_true")
+    parser.add_argument("-c", "--cache_directory", help = "specify directory for cached trees and images", default = DEFAULT_CACHE_DIR)
+    parser.add_argument("-s", "--cache_size", help = "specify maximum size of cache in MB", type = float, default = DEFAULT_CACHE_SIZE)
+    parser.add_argument("--no_cache", help = "always rebuild tree and image without using the cache", action = "store_true")
+    parser.add_argument("-m", "--min_reads", help = "collapse taxonomic groups covering fewer reads than this", type = int, default = 0)
+    parser.add_argument("-p", "--min_percentage", help = "collapse taxonomic groups covering a smaller percentage of reads than this", type = float, default = 0.0)
+    parser.add_argument("-d", "--taxonomy_directory", help = "specify directory containing nodes.dmp and names.dmp to colour tips by phylum using the rank-lineage table", default = None)
+    parser.add_argument("-t", "--max_tips", help = f"specify maximum number of tree tips, 0 for no limit (default = {DEFAULT_MAX_TIPS})", type = int, default = DEFAULT_MAX_TIPS)
     args = parser.parse_args()
 
-    # obtain classified taxids from Kraken2/Bracken report output
-    with open(args.i, "r") as r:
-        classified_taxids = []
-        for line in r:
-            tab = line.split("\t")
-            if tab[3] == "U" or tab[3] == "R":
-                continue
-            else:
-                classified_taxids.append(tab[4])
-
-    # Prune NCBI taxonomy tree
     ncbi = NCBITaxa()
     if args.update_taxonomy:
         ncbi.update_taxonomy_database()
-    tree = ncbi.get_topology(classified_taxids)
 
-    # Export Newick tree for R
+    # obtain classified taxa from Kraken2/Bracken report output and collapse low-abundance subtrees
+    entries = load_report(args.i)
+    kept, other = collapse_report(entries, args.min_reads, args.min_percentage, args.max_tips)
+    kept, other = match_taxonomy(ncbi, entries, kept, other)
+    classified_taxids = [entries[i]["taxid"] for i in kept if entries[i]["rank"] not in ("U", "R")]
+    # "other" tips are keyed by label and name, as both are written into the NHX tree
+    other_labels = [f"{entries[i]['taxid']}_other\tOther {entries[i]['name']}" for i in other]
+
+    # Export collapsed report for R
+    lod_report = "radial_tree_report.txt"
+    write_collapsed_report(entries, kept, other, lod_report)
+
+    # Export phylum of each tip for R (otherwise R highlights phylum nodes found in the tree)
+    phyla_file = None
+    if args.taxonomy_directory is not None:
+        phyla_file = "radial_tree_phyla.txt"
+        write_phyla(entries, kept, other, os.path.join(orig_dir, args.taxonomy_directory), phyla_file)
+
+    # cache keys: pruned tree depends on the taxid set, "other" tips and taxonomy version,
+    # rendered image additionally on the read counts and render options
+    cache = None if args.no_cache else RenderCache(args.cache_directory, args.cache_size)
+    tree_key = make_key("tree", *sorted(set(classified_taxids + other_labels)), file_signature(ncbi.dbfile))
+    img_ext = os.path.splitext(args.output_tree)[1] or ".svg"
+    img_key = make_key("image", tree_key, file_digest(lod_report), file_digest(phyla_file) if phyla_file else "", img_ext, file_signature(R_SCRIPT))
+
+    # Prune NCBI taxonomy tree and export Newick tree for R
     out = "radial_tree.txt"
-    tree.write(features = ["name", "sci_name", "taxid", "rank"], format = 3, outfile = out)
-    
+    if cache is None or not cache.fetch(tree_key, ".nhx", out):
+        tree = build_tree(ncbi, classified_taxids)
+        tree = add_other_tips(tree, entries, other)
+        tree.write(features = ["name", "sci_name", "taxid", "rank"], format = 3, outfile = out)
+        if cache is not None:
+            cache.put(tree_key, ".nhx", out)
+
+    # Reuse previously rendered image if available
+    if cache is not None and cache.fetch(img_key, img_ext, args.output_tree):
+        return
+
     # Call R script with Newick tree file as input
-    cmd = f"Rscript ~/cavs-taxonomic-classification/generate_radial_tree.R {out} {args.i} {args.output_tree}"
-    os.system(cmd)
-    
+    # (remove image left over from an earlier report so a failed render is never cached)
+    if os.path.exists(args.output_tree):
+        os.remove(args.output_tree)
+    cmd = f"Rscript {R_SCRIPT} {out} {lod_report} {args.output_tree}"
+    if phyla_file is not None:
+        cmd += f" {phyla_file}"
+    status = os.system(cmd)
+    if status != 0:
+        print(f"Failed to visualise radial tree (Rscript exit status {status})")
+        return
+    if cache is not None and os.path.exists(args.output_tree):
+        cache.put(img_key, img_ext, args.output_tree)
+
+def load_report(file):
+    """Parse Kraken2/Bracken report, recovering the hierarchy from the name indentation"""
+    entries = []
+    stack = [] # indices of current lineage
+    with open(file, "r") as r:
+        for line in r:
+            line = line.rstrip("\n")
+            if line == "":
+                continue
+            tab = line.split("\t")
+            name = tab[5]
+            depth = (len(name) - len(name.lstrip(" "))) // 2
+            del stack[depth:]
+            entry = {
+                "percentage": float(tab[0]),
+                "num_cover": int(tab[1]),
+                "num_direct": int(tab[2]),
+                "rank": tab[3],
+                "taxid": tab[4],
+                "name": name.strip(),
+                "parent": stack[-1] if stack and tab[3] != "U" else None,
+                "children": [],
+            }
+            if entry["parent"] is not None:
+                entries[entry["parent"]]["children"].append(len(entries))
+            stack.append(len(entries))
+            entries.append(entry)
+    return entries
+
+def collapse_report(entries, min_reads = 0, min_percentage = 0.0, max_tips = DEFAULT_MAX_TIPS):
+    """Select the taxa to draw, keeping the most abundant lineages intact
+
+    Taxa are added top-down in order of decreasing read coverage while they pass
+    the read/percentage thresholds and the tip budget allows. Each kept taxon
+    without kept children becomes a tip carrying the reads of its whole clade;
+    each kept taxon with both kept and collapsed children gets an extra "other"
+    tip carrying the reads of the collapsed children. The root is never a tip
+    itself, so it gets an "other" tip whenever any of its children are collapsed.
+
+    Returns:
+        kept (set of entry indices), other (dict of entry index -> collapsed entry indices)
+
+    """
+    def passes(i):
+        e = entries[i]
+        return e["num_cover"] >= min_reads and e["percentage"] >= min_percentage
+
+    roots = [i for i, e in enumerate(entries) if e["parent"] is None and e["rank"] != "U"]
+    kept = set(roots)
+    dropped = {i: len(entries[i]["children"]) for i in roots} # number of collapsed children per kept taxon
+    tips = sum(1 for i in roots if dropped[i] > 0) # root "other" tips
+
+    heap = []
+    for i in roots:
+        for c in entries[i]["children"]:
+            if passes(c):
+                heapq.heappush(heap, (-entries[c]["num_cover"], c))
+
+    while heap:
+        _, i = heapq.heappop(heap)
+        p = entries[i]["parent"]
+        # new taxon adds a tip; parent loses its tip ("other" tip, or itself
+        # if it had no kept children) if this was its last collapsed child
+        delta = 1 if dropped[p] > 1 else 0
+        if max_tips > 0 and tips + delta > max_tips:
+            continue
+        kept.add(i)
+        dropped[p] -= 1
+        dropped[i] = len(entries[i]["children"])
+        tips += delta
+        for c in entries[i]["children"]:
+            if passes(c):
+                heapq.heappush(heap, (-entries[c]["num_cover"], c))
+
+    other = {}
+    for i in kept:
+        children = entries[i]["children"]
+        if dropped[i] > 0 and (dropped[i] < len(children) or i in roots):
+            other[i] = [c for c in children if c not in kept]
+    return kept, other
+
+def match_taxonomy(ncbi, entries, kept, other):
+    """Translate merged taxids and drop taxa missing from the NCBI taxonomy, so report rows match tree labels"""
+    taxids = [int(entries[i]["taxid"]) for i in kept if entries[i]["rank"] != "U"]
+    translated, merged = ncbi._translate_merged(taxids)
+    known = set(ncbi.get_rank(translated).keys())
+    for i in kept:
+        e = entries[i]
+        if e["rank"] != "U" and int(e["taxid"]) in merged:
+            e["taxid"] = str(merged[int(e["taxid"])])
+
+    missing = set(i for i in kept if entries[i]["rank"] not in ("U", "R") and int(entries[i]["taxid"]) not in known)
+    for i in missing:
+        print(f"Taxid {entries[i]['taxid']} ({entries[i]['name']}) not found in NCBI taxonomy - leaving it out of the radial tree")
+    kept = kept - missing
+    other = {i: v for i, v in other.items() if i not in missing}
+    return kept, other
+
+def write_collapsed_report(entries, kept, other, file):
+    """Write kept taxa and aggregated "other" tips in Kraken2 report format for R"""
+    with open(file, "w") as w:
+        for i, e in enumerate(entries):
+            if i not in kept:
+                continue
+            if e["rank"] == "R" and i in other:
+                # root is not drawn as a tip - only its "other" tip
+                collapsed = [entries[c] for c in other[i]]
+                percentage = sum(c["percentage"] for c in collapsed)
+                num_cover = sum(c["num_cover"] for c in collapsed)
+                w.write(f"{percentage:.2f}\t{num_cover}\t{num_cover}\t-\t{e['taxid']}_other\tOther {e['name']}\n")
+                continue
+            num_direct = e["num_direct"]
+            if not any(c in kept for c in e["children"]):
+                num_direct = e["num_cover"] # tip stands in for its collapsed clade
+            w.write(f"{e['percentage']:.2f}\t{e['num_cover']}\t{num_direct}\t{e['rank']}\t{e['taxid']}\t{e['name']}\n")
+            if i in other:
+                collapsed = [entries[c] for c in other[i]]
+                percentage = sum(c["percentage"] for c in collapsed)
+                num_cover = sum(c["num_cover"] for c in collapsed)
+                w.write(f"{percentage:.2f}\t{num_cover}\t{num_cover}\t-\t{e['taxid']}_other\tOther {e['name']}\n")
+
+def write_phyla(entries, kept, other, tax_dir, file):
+    """Write phylum name of each kept taxon and "other" tip, looked up in the rank-lineage table"""
+    # numpy is only needed for this optional step
+    from rank_lineage import load_rank_lineage, assign_rank, load_names
+
+    labels = []
+    taxids = []
+    for i in sorted(kept):
+        e = entries[i]
+        if e["rank"] in ("U", "R"):
+            continue
+        labels.append(e["taxid"])
+        taxids.append(int(e["taxid"]))
+        if i in other:
+            labels.append(f"{e['taxid']}_other")
+            taxids.append(int(e["taxid"]))
+
+    table = load_rank_lineage(tax_dir)
+    phyla = assign_rank(table, "phylum", taxids)
+    names = load_names(os.path.join(tax_dir, "names.dmp"), set(phyla.tolist()))
+    with open(file, "w") as w:
+        w.write("label\tPhyla\n")
+        for label, phylum in zip(labels, phyla.tolist()):
+            if phylum == 0:
+                continue
+            w.write(f"{label}\t{names.get(phylum, str(phylum))}\n")
+
+def build_tree(ncbi, taxids):
+    """Prune NCBI taxonomy tree to exactly the given taxids"""
+    taxids = sorted(set(int(t) for t in taxids))
+    if len(taxids) >= 2:
+        return ncbi.get_topology(taxids)
+
+    # get_topology fails on no taxids and returns the whole NCBI subtree of a single taxid,
+    # so build the tree of the root and (at most) one taxon by hand
+    tree = make_root_node()
+    if taxids:
+        names = ncbi.get_taxid_translator(taxids)
+        ranks = ncbi.get_rank(taxids)
+        child = tree.add_child(name = str(taxids[0]))
+        child.add_features(sci_name = names.get(taxids[0], ""), taxid = taxids[0], rank = ranks.get(taxids[0], "no rank"))
+    return tree
+
+def make_root_node():
+    root = Tree()
+    root.name = "1"
+    root.add_features(sci_name = "root", taxid = 1, rank = "no rank")
+    return root
+
+def add_other_tips(tree, entries, other):
+    """Attach aggregated "other" tips to the pruned NCBI taxonomy tree
+
+    Returns:
+        tree (re-rooted at taxid 1 if the root has an "other" tip)
+
+    """
+    for i in other:
+        e = entries[i]
+        if e["rank"] == "R":
+            # get_topology detaches the NCBI root when it has a single child - restore it
+            # so the root's "other" tip is not drawn inside that child's clade
+            if tree.name != "1":
+                root = make_root_node()
+                root.add_child(tree)
+                tree = root
+            node = tree
+        else:
+            node = tree.search_nodes(name = e["taxid"])[0] # taxids already matched to the taxonomy
+        child = node.add_child(name = f"{e['taxid']}_other")
+        child.add_features(sci_name = f"Other {e['name']}", taxid = f"{e['taxid']}_other", rank = "other")
+    return tree
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------
+# Created By: Irsyaad Hasif (hasifirsyaad@gmail.com)
+# Created On: 19 Oct 2026
+# Version: 1.0
+#------------------------------------------------------------------
+# This script precomputes a dense rank-lineage table from the NCBI
+# nodes.dmp, mapping every taxid to its ancestor at each major rank.
+# The table is cached next to nodes.dmp and used to roll up read
+# counts from one or more Kraken2/Bracken reports to any major rank.
+#------------------------------------------------------------------
+
+import os
+import argparse
+import numpy as np
+from file_utils import file_signature
+
+# major ranks and the nodes.dmp rank names that map onto them
+RANKS = ["domain", "kingdom", "phylum", "class", "order", "family", "genus", "species"]
+RANK_ALIASES = {
+    "superkingdom": "domain",
+    "domain": "domain",
+    "kingdom": "kingdom",
+    "phylum": "phylum",
+    "class": "class",
+    "order": "order",
+    "family": "family",
+    "genus": "genus",
+    "species": "species",
+}
+TABLE_FILENAME = "rank_lineage.npz"
+
+def main():
+    cwd = os.getcwd()
+    tax_dir = os.path.join(cwd, "taxonomy")
+
+    parser = argparse.ArgumentParser(description = "Rolls up Kraken2/Bracken report read counts to a major taxonomic rank")
+    parser.add_argument("-i", nargs = "+", required = True, help = "specify one or more Kraken2/Bracken report outputs")
+    parser.add_argument("-r", "--rank", help = "specify rank to roll up to", choices = RANKS, default = "phylum")
+    parser.add_argument("-t", "--taxonomy_directory", help = "specify directory containing nodes.dmp and names.dmp", default = tax_dir)
+    parser.add_argument("-o", "--output", help = "specify filename of output table (tab-separated)", default = "rank_summary.tsv")
+    parser.add_argument("-f", "--force", help = "rebuild rank-lineage table even if a cached table is found", action = "store_true")
+    args = parser.parse_args()
+
+    done_msg = "DONE"
+
+    print("Loading rank-lineage table...", end = " ")
+    table = load_rank_lineage(args.taxonomy_directory, force = args.force)
+    print(done_msg)
+
+    print("Reading reports...", end = " ")
+    taxids, counts = load_report_counts(args.i)
+    print(done_msg)
+
+    print(f"Rolling up read counts to {args.rank} level...", end = " ")
+    rank_taxids, rank_counts = rollup(table, args.rank, taxids, counts)
+    print(done_msg)
+
+    names = load_names(os.path.join(args.taxonomy_directory, "names.dmp"), set(rank_taxids.tolist()))
+    with open(args.output, "w") as w:
+        samples = [os.path.basename(f) for f in args.i]
+        w.write("\t".join(["taxid", "name"] + samples) + "\n")
+        for i in range(len(rank_taxids)):
+            taxid = int(rank_taxids[i])
+            name = names.get(taxid, "unknown") if taxid != 0 else f"unassigned at {args.rank} level"
+            row = [str(taxid), name] + [str(int(c)) for c in rank_counts[i]]
+            w.write("\t".join(row) + "\n")
+    print(f"Successfully wrote {args.rank} summary to {args.output}")
+
+def build_rank_lineage(filename = "nodes.dmp"):
+    """Build rank-lineage table from NCBI nodes.dmp
+
+    Args:
+        filename (str): filename of NCBI nodes
+
+    Returns:
+        dict of rank -> int32 array indexed by taxid, holding the ancestor
+        taxid at that rank (0 if the taxid has no ancestor at that rank)
+
+    """
+    taxids = []
+    parents = []
+    ranks = []
+    with open(filename, "r") as r:
+        for line in r:
+            tab = line.rstrip("\t|\n").split("\t|\t")
+            taxids.append(int(tab[0]))
+            parents.append(int(tab[1]))
+            ranks.append(RANK_ALIASES.get(tab[2].strip(), ""))
+
+    taxids = np.array(taxids, dtype = np.int32)
+    parents = np.array(parents, dtype = np.int32)
+    # a filtered nodes.dmp (filter_ncbi_taxonomy.py) lacks the parents of its top groups -
+    # point those at 0 so the walk ends cleanly at the top of the filtered tree
+    parents[~np.isin(parents, taxids)] = 0
+    size = int(taxids.max()) + 1
+    parent = np.zeros(size, dtype = np.int32)
+    parent[taxids] = parents
+    ranks = np.array(ranks)
+
+    table = {}
+    for rank in RANKS:
+        # own[t] = t if t itself is at this rank
+        own = np.zeros(size, dtype = np.int32)
+        at_rank = taxids[ranks == rank]
+        own[at_rank] = at_rank
+
+        # walk all unresolved nodes up one parent per iteration until an ancestor at rank is found
+        col = own.copy()
+        todo = taxids[col[taxids] == 0]
+        anc = parent[todo]
+        while len(todo) > 0:
+            found = own[anc]
+            col[todo] = found
+            keep = (found == 0) & (anc != parent[anc])
+            todo = todo[keep]
+            anc = parent[anc[keep]]
+        table[rank] = col
+
+    return table
+
+def load_rank_lineage(tax_dir, force = False):
+    """Load rank-lineage table cached in tax_dir, (re)building it if stale"""
+    nodes_file = os.path.join(tax_dir, "nodes.dmp")
+    table_file = os.path.join(tax_dir, TABLE_FILENAME)
+    signature = file_signature(nodes_file)
+
+    if not force and os.path.exists(table_file):
+        with np.load(table_file) as npz:
+            if str(npz["signature"]) == signature:
+                return {rank: npz[rank] for rank in RANKS}
+
+    table = build_rank_lineage(nodes_file)
+    tmp = table_file + ".tmp.npz"
+    np.savez(tmp, signature = np.array(signature), **table)
+    os.replace(tmp, table_file)
+    return table
+
+def assign_rank(table, rank, taxids):
+    """Ancestor taxid at a major rank for each taxid (0 if none or taxid unknown)"""
+    col = table[rank]
+    taxids = np.asarray(taxids, dtype = np.int64)
+    valid = (taxids >= 0) & (taxids < len(col))
+    anc = np.zeros(len(taxids), dtype = np.int32)
+    anc[valid] = col[taxids[valid]]
+    return anc
+
+def rollup(table, rank, taxids, counts):
+    """Roll up per-taxid counts to a major rank
+
+    Args:
+        table (dict): rank-lineage table from load_rank_lineage
+        rank (str): one of RANKS
+        taxids (array): taxids, shape (n,)
+        counts (array): counts, shape (n,) or (n, samples)
+
+    Returns:
+        rank_taxids, rank_counts - rank_taxid 0 collects counts with no ancestor at rank
+
+    """
+    # taxids newer than the taxonomy are treated as unassigned
+    anc = assign_rank(table, rank, taxids)
+    counts = np.asarray(counts)
+
+    rank_taxids, inv = np.unique(anc, return_inverse = True)
+    if counts.ndim == 1:
+        rank_counts = np.bincount(inv, weights = counts, minlength = len(rank_taxids))
+    else:
+        rank_counts = np.stack([np.bincount(inv, weights = counts[:, j], minlength = len(rank_taxids)) for j in range(counts.shape[1])], axis = 1)
+    return rank_taxids, rank_counts
+
+def load_report_counts(files):
+    """Read directly assigned read counts from Kraken2/Bracken reports
+
+    Returns:
+        taxids (n,), counts (n, len(files))
+
+    """
+    index = {}
+    per_file = []
+    for file in files:
+        sample = {}
+        with open(file, "r") as r:
+            for line in r:
+                tab = line.split("\t")
+                if tab[3] == "U":
+                    continue
+                taxid = int(tab[4])
+                sample[taxid] = sample.get(taxid, 0) + int(tab[2])
+                if taxid not in index:
+                    index[taxid] = len(index)
+        per_file.append(sample)
+
+    taxids = np.fromiter(index.keys(), dtype = np.int64, count = len(index))
+    counts = np.zeros((len(index), len(files)), dtype = np.int64)
+    for j, sample in enumerate(per_file):
+        for taxid, count in sample.items():
+            counts[index[taxid], j] = count
+    return taxids, counts
+
+def load_names(filename, taxids):
+    """Load scientific names from names.dmp for the given taxids only"""
+    names = {}
+    if not os.path.exists(filename):
+        return names
+    with open(filename, "r") as r:
+        for line in r:
+            tab = line.rstrip("\t|\n").split("\t|\t")
+            if not tab[3].startswith("scientific name"):
+                continue
+            taxid = int(tab[0])
+            if taxid in taxids:
+                names[taxid] = tab[1]
+    return names
+
+if __name__ == "__main__":
+    main()
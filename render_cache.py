@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#------------------------------------------------------------------
+# Created By: Irsyaad Hasif (hasifirsyaad@gmail.com)
+# Created On: 19 Oct 2026
+# Version: 1.0
+#------------------------------------------------------------------
+# This module implements a local content-addressed cache for the
+# pruned taxonomy trees and rendered radial tree images produced by
+# generate_radial_tree.py. Entries are keyed by a hash of their
+# inputs and evicted in least-recently-used order under a size cap.
+#------------------------------------------------------------------
+
+import os
+import hashlib
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cavs-taxonomic-classification", "radial_tree")
+DEFAULT_CACHE_SIZE = 2048 # MB
+
+def make_key(*parts):
+    """Hash an ordered sequence of strings into a cache key"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def file_digest(filename, chunk_size = 1 << 20):
+    """Hash the contents of a file"""
+    h = hashlib.sha256()
+    with open(filename, "rb") as r:
+        for chunk in iter(lambda: r.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class RenderCache(object):
+    def __init__(self, cache_dir = DEFAULT_CACHE_DIR, max_size = DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    # returns path to cached artifact (marking it as recently used), or None on a miss
+    def get(self, key, ext):
+        path = self._path(key, ext)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    # copies cached artifact to dst; returns False on a miss
+    def fetch(self, key, ext, dst):
+        path = self.get(key, ext)
+        if path is None:
+            return False
+        shutil.copyfile(path, dst)
+        return True
+
+    # copies src into the cache atomically, then evicts old entries
+    def put(self, key, ext, src):
+        path = self._path(key, ext)
+        fd, tmp = tempfile.mkstemp(dir = self.cache_dir, suffix = ".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+        return path
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass